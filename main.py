@@ -4,6 +4,7 @@ Main script for the Agentic RAG System.
 
 import sys
 import os
+import asyncio
 from pathlib import Path
 
 # Add src to path
@@ -15,7 +16,7 @@ from src.simple_rag import SimpleRAG
 from src.agentic_rag import AgenticRAG
 
 
-def main():
+async def main():
     """Main entry point for the RAG system."""
     
     print("=== Agentic RAG System ===\n")
@@ -85,10 +86,10 @@ def main():
             else:
                 print("\nSearching...")
             
-            result = rag.query(query, k=5, verbose=verbose)
-            
-            print(f"\nAnswer: {result['answer']}")
-            
+            # The answer streams to the terminal as it is generated
+            result = await rag.query(query, k=5, verbose=verbose, stream=True)
+            print()
+
             if result['sources']:
                 print(f"\nSources: {', '.join(result['sources'])}")
             
@@ -106,5 +107,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
@@ -3,16 +3,43 @@ Agentic RAG module with multi-step reasoning, iterative refinement, and self-ref
 """
 
 import os
-import json
+import uuid
+import asyncio
+import orjson
+import xxhash
+import numpy as np
 from typing import List, Dict, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 from vector_store import VectorStore
+from semantic_cache import SemanticCache
 
 # Load environment variables
 load_dotenv()
 
+# Invariant instructions live in the system message so repeat calls share a
+# stable prompt prefix and hit OpenAI's prompt cache; only the retrieved
+# contexts and the question vary per call, and they go last.
+ANSWER_SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on provided documents. Be thorough and accurate.
+Use the documents given in the user message to answer the question at the end. If the answer is not in the documents, say so.
+If the same question is asked again with additional context, synthesize all of the information into one complete answer."""
+
+# Mean top-3 retrieval distance (1 - cosine similarity) below which the
+# initial answer is trusted without a reflection LLM call
+HIGH_CONFIDENCE_DISTANCE = 0.5
+
+# Answers containing these phrases are hedging and always get reflected on
+HEDGE_PHRASES = (
+    "not in the documents",
+    "no relevant documents",
+    "cannot answer",
+    "don't have enough information",
+)
+
+# MMR trade-off between query relevance and diversity among selected chunks
+MMR_LAMBDA = 0.7
+
 
 class AgenticRAG:
     """Agentic RAG system with planning, iteration, and reflection capabilities."""
@@ -33,10 +60,16 @@ class AgenticRAG:
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
         self.model = 'gpt-4o-mini'
-    
-    def _plan_query(self, query: str) -> Dict:
+        # Stable per-session key so OpenAI routes requests to the same
+        # cache shard, improving prompt-cache hit rates
+        self.session_id = uuid.uuid4().hex
+        # Paraphrased repeat queries skip the whole plan/search/reflect loop;
+        # sharing encode_query means a cache miss costs no extra forward pass
+        self.cache = SemanticCache(vector_store.encode_query)
+
+    async def _plan_query(self, query: str) -> Dict:
         """
         Plan the query by breaking it down into sub-queries if needed.
         
@@ -61,17 +94,18 @@ If the query is simple and straightforward, set needs_decomposition to false and
 If the query is complex (e.g., comparing multiple concepts, multi-part questions), break it down."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a query planning assistant. Always respond with valid JSON only."},
                     {"role": "user", "content": planning_prompt}
                 ],
                 temperature=0.1,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                prompt_cache_key=self.session_id
             )
             
-            plan = json.loads(response.choices[0].message.content)
+            plan = orjson.loads(response.choices[0].message.content)
             return plan
         except Exception as e:
             # Fallback: treat as simple query
@@ -81,11 +115,73 @@ If the query is complex (e.g., comparing multiple concepts, multi-part questions
                 "sub_queries": []
             }
     
-    def _search_and_retrieve(self, query: str, k: int = 5) -> List[Dict]:
+    async def _search_and_retrieve(self, query: str, k: int = 5) -> List[Dict]:
         """Retrieve relevant documents for a query."""
-        return self.vector_store.search(query, k=k)
-    
-    def _check_completeness(self, query: str, answer: str, retrieved_docs: List[Dict]) -> Dict:
+        return await self.vector_store.search_async(query, k=k)
+
+    def _mmr_rerank(self, query: str, docs: List[Dict], limit: int) -> List[Dict]:
+        """
+        Select up to `limit` docs by Maximal Marginal Relevance.
+
+        Scores each candidate as lambda * sim(query, doc) minus
+        (1 - lambda) * its max similarity to already-selected docs, so the
+        kept set stays relevant without near-duplicates crowding out
+        diverse chunks. Runs entirely on the embeddings cached with each
+        document, so no re-encoding happens here.
+
+        Args:
+            query: User query
+            docs: Candidate documents with cached 'embedding' entries
+            limit: Maximum number of documents to keep
+
+        Returns:
+            Selected documents, most relevant first
+        """
+        if len(docs) <= limit or any('embedding' not in doc for doc in docs):
+            return docs[:limit]
+
+        embeddings = np.vstack([doc['embedding'] for doc in docs]).astype('float32')
+        query_embedding = self.vector_store.encode_query(query)[0]
+
+        relevance = embeddings @ query_embedding
+        similarity = embeddings @ embeddings.T
+
+        selected = [int(np.argmax(relevance))]
+        while len(selected) < limit:
+            mmr = MMR_LAMBDA * relevance \
+                - (1 - MMR_LAMBDA) * similarity[:, selected].max(axis=1)
+            mmr[selected] = -np.inf
+            selected.append(int(np.argmax(mmr)))
+
+        return [docs[i] for i in selected]
+
+    def _is_high_confidence(self, answer: str, retrieved_docs: List[Dict]) -> bool:
+        """
+        Cheap pre-reflection check using the FAISS scores already in hand.
+
+        When the top retrieved chunks scored well and the answer does not
+        hedge, reflection is very unlikely to request refinement, so the
+        reflection LLM round trip can be skipped entirely.
+
+        Args:
+            answer: Generated answer
+            retrieved_docs: Documents used to generate the answer
+
+        Returns:
+            True if reflection can safely be skipped
+        """
+        if not retrieved_docs:
+            return False
+
+        top_docs = retrieved_docs[:3]
+        mean_distance = sum(doc.get('distance', 1.0) for doc in top_docs) / len(top_docs)
+        if mean_distance >= HIGH_CONFIDENCE_DISTANCE:
+            return False
+
+        answer_lower = answer.lower()
+        return not any(phrase in answer_lower for phrase in HEDGE_PHRASES)
+
+    async def _check_completeness(self, query: str, answer: str, retrieved_docs: List[Dict]) -> Dict:
         """
         Check if the answer is complete and if more information is needed.
         
@@ -130,17 +226,18 @@ Respond in JSON format:
 }}"""
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a quality assessment assistant. Always respond with valid JSON only."},
                     {"role": "user", "content": reflection_prompt}
                 ],
                 temperature=0.1,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                prompt_cache_key=self.session_id
             )
             
-            assessment = json.loads(response.choices[0].message.content)
+            assessment = orjson.loads(response.choices[0].message.content)
             return assessment
         except Exception as e:
             # Fallback: assume complete
@@ -152,134 +249,175 @@ Respond in JSON format:
                 "refinement_query": ""
             }
     
-    def _generate_answer(self, query: str, contexts: List[str], sources: List[str], iteration: int = 0) -> str:
+    async def _generate_answer(self, query: str, contexts: List[str], sources: List[str],
+                               stream: bool = False) -> str:
         """
         Generate an answer from retrieved contexts.
-        
+
         Args:
             query: User query
             contexts: List of context strings from retrieved documents
             sources: List of source document names
-            iteration: Current iteration number
-            
+            stream: Whether to print tokens to stdout as they arrive
+
         Returns:
             Generated answer
         """
         if not contexts:
-            return "No relevant documents found to answer this question."
-        
-        # Ensure contexts and sources have the same length
-        if len(contexts) != len(sources):
-            # Use the shorter length to avoid index errors
-            min_len = min(len(contexts), len(sources))
-            contexts = contexts[:min_len]
-            sources = sources[:min_len]
+            answer = "No relevant documents found to answer this question."
+            if stream:
+                print(answer, end='', flush=True)
+            return answer
         
-        context_text = "\n\n".join([
-            f"Context {i+1} (from {sources[i]}):\n{ctx}"
-            for i, ctx in enumerate(contexts)
-        ])
+        # zip stops at the shorter of contexts/sources, and the generator
+        # feeds str.join without materializing an intermediate list
+        context_text = "\n\n".join(
+            f"Context {i} (from {source}):\n{ctx}"
+            for i, (source, ctx) in enumerate(zip(sources, contexts), 1)
+        )
         
-        if iteration > 0:
-            prompt = f"""You are refining your answer based on additional context. Use the following documents to provide a comprehensive answer.
-
-Previous iteration: {iteration}
-Context from documents:
+        # Contexts accumulate by appending across iterations, so this user
+        # message extends the previous one and the shared prefix stays cached
+        prompt = f"""Context from documents:
 {context_text}
 
 Question: {query}
 
-Provide a complete answer that synthesizes all the information:"""
-        else:
-            prompt = f"""Use the following documents to answer the question. If the answer is not in the documents, say so.
+Answer:"""
 
-Context from documents:
-{context_text}
+        messages = [
+            {"role": "system", "content": ANSWER_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
 
-Question: {query}
+        try:
+            if stream:
+                # Streaming drops time-to-first-token from full generation
+                # time to one round trip
+                response_stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.1,
+                    prompt_cache_key=self.session_id,
+                    stream=True
+                )
 
-Answer:"""
+                parts = []
+                async for chunk in response_stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        token = chunk.choices[0].delta.content
+                        parts.append(token)
+                        print(token, end='', flush=True)
+                return ''.join(parts)
 
-        try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that answers questions based on provided documents. Be thorough and accurate."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
+                messages=messages,
+                temperature=0.1,
+                prompt_cache_key=self.session_id
             )
-            
+
             return response.choices[0].message.content
         except Exception as e:
-            return f"Error generating answer: {str(e)}"
+            answer = f"Error generating answer: {str(e)}"
+            if stream:
+                print(answer, end='', flush=True)
+            return answer
     
-    def query(self, query: str, k: int = 5, verbose: bool = False) -> Dict:
+    async def query(self, query: str, k: int = 5, verbose: bool = False,
+                    stream: bool = False) -> Dict:
         """
         Query the agentic RAG system with planning, iteration, and reflection.
-        
+
         Args:
             query: User query
             k: Number of documents to retrieve per search
             verbose: Whether to print intermediate steps
-            
+            stream: Whether to print the answer to stdout as it is generated
+
         Returns:
             Dictionary with 'answer', 'sources', 'iterations', and 'reasoning'
         """
+        # Serve semantically similar repeat queries from cache
+        cached = self.cache.get(query)
+        if cached is not None:
+            if verbose:
+                print("Semantic cache hit, returning cached answer")
+            if stream:
+                print(f"\nAnswer: {cached['answer']}", end='', flush=True)
+            return cached
+
         all_retrieved_docs = []
         all_sources = set()
         iterations_used = []
-        
-        # Step 1: Plan the query
+
+        # Steps 1 and 2: plan the query while the first-round retrieval for
+        # the original query runs, hiding the search behind planning latency
         if verbose:
             print("Planning query...")
-        plan = self._plan_query(query)
-        
+        plan, initial_docs = await asyncio.gather(
+            self._plan_query(query),
+            self.vector_store.search_async(query, k=k)
+        )
+
         if verbose and plan.get('needs_decomposition'):
             print(f"Query decomposed into {len(plan.get('sub_queries', []))} sub-queries")
-        
-        # Step 2: Execute searches
-        queries_to_search = plan.get('sub_queries', []) if plan.get('needs_decomposition') else [query]
-        
-        # Ensure we have at least one query to search
-        if not queries_to_search:
-            queries_to_search = [query]
-        
-        for search_query in queries_to_search:
+
+        all_retrieved_docs.extend(initial_docs)
+        all_sources.update([doc.get('source', 'unknown') for doc in initial_docs])
+
+        # Search sub-queries (if any) in one batched call
+        sub_queries = plan.get('sub_queries', []) if plan.get('needs_decomposition') else []
+        if sub_queries:
             if verbose:
-                print(f"Searching: {search_query}")
-            docs = self._search_and_retrieve(search_query, k=k)
-            all_retrieved_docs.extend(docs)
-            all_sources.update([doc.get('source', 'unknown') for doc in docs])
+                for search_query in sub_queries:
+                    print(f"Searching: {search_query}")
+            for docs in await self.vector_store.search_batch_async(sub_queries, k=k):
+                all_retrieved_docs.extend(docs)
+                all_sources.update([doc.get('source', 'unknown') for doc in docs])
         
-        # Remove duplicates while preserving order
-        seen_texts = set()
+        # Remove duplicates while preserving order; compare cheap 64-bit
+        # fingerprints instead of hashing full chunk strings on every check
+        seen_hashes = set()
         unique_docs = []
         for doc in all_retrieved_docs:
             doc_text = doc.get('text', '')
-            if doc_text and doc_text not in seen_texts:
-                seen_texts.add(doc_text)
+            text_hash = xxhash.xxh64_intdigest(doc_text)
+            if doc_text and text_hash not in seen_hashes:
+                seen_hashes.add(text_hash)
                 unique_docs.append(doc)
         
-        all_retrieved_docs = unique_docs[:k*2]  # Limit total docs
+        # Keep the k*2 most relevant-but-diverse candidates
+        all_retrieved_docs = self._mmr_rerank(query, unique_docs, limit=k*2)
         
         # Step 3: Generate initial answer
         contexts = [doc.get('text', '') for doc in all_retrieved_docs if doc.get('text')]
         sources_list = [doc.get('source', 'unknown') for doc in all_retrieved_docs if doc.get('text')]
         
-        answer = self._generate_answer(query, contexts, sources_list, iteration=0)
+        if stream:
+            print("\nAnswer: ", end='', flush=True)
+        answer = await self._generate_answer(query, contexts, sources_list, stream=stream)
         iterations_used.append({
             'iteration': 0,
             'docs_retrieved': len(all_retrieved_docs),
             'answer': answer
         })
         
+        # Skip reflection when retrieval already scored well and the answer
+        # does not hedge; this saves an LLM round trip on easy queries
+        if self._is_high_confidence(answer, all_retrieved_docs):
+            if verbose:
+                print("Initial answer is high-confidence, skipping reflection")
+            max_iterations = 1
+        else:
+            max_iterations = self.max_iterations
+
         # Step 4: Iterative refinement
-        for iteration in range(1, self.max_iterations):
+        for iteration in range(1, max_iterations):
             if verbose:
                 print(f"Reflecting on answer (iteration {iteration})...")
             
-            assessment = self._check_completeness(query, answer, all_retrieved_docs)
+            assessment = await self._check_completeness(query, answer, all_retrieved_docs)
             
             if not assessment.get('needs_refinement', False):
                 if verbose:
@@ -294,21 +432,25 @@ Answer:"""
                 print(f"Refining search: {refinement_query}")
             
             # Search for additional information
-            additional_docs = self._search_and_retrieve(refinement_query, k=max(1, k//2))
+            additional_docs = await self._search_and_retrieve(refinement_query, k=max(1, k//2))
             
             # Add new docs if they're different
             for doc in additional_docs:
                 doc_text = doc.get('text', '')
-                if doc_text and doc_text not in seen_texts:
-                    seen_texts.add(doc_text)
+                text_hash = xxhash.xxh64_intdigest(doc_text)
+                if doc_text and text_hash not in seen_hashes:
+                    seen_hashes.add(text_hash)
                     all_retrieved_docs.append(doc)
                     all_sources.add(doc.get('source', 'unknown'))
             
-            # Regenerate answer with all context
-            contexts = [doc.get('text', '') for doc in all_retrieved_docs[:k*2] if doc.get('text')]
-            sources_list = [doc.get('source', 'unknown') for doc in all_retrieved_docs[:k*2] if doc.get('text')]
+            # Regenerate answer with the best k*2 of all accumulated context
+            ranked_docs = self._mmr_rerank(query, all_retrieved_docs, limit=k*2)
+            contexts = [doc.get('text', '') for doc in ranked_docs if doc.get('text')]
+            sources_list = [doc.get('source', 'unknown') for doc in ranked_docs if doc.get('text')]
             
-            answer = self._generate_answer(query, contexts, sources_list, iteration=iteration)
+            if stream:
+                print("\n\nRefined answer: ", end='', flush=True)
+            answer = await self._generate_answer(query, contexts, sources_list, stream=stream)
             iterations_used.append({
                 'iteration': iteration,
                 'docs_retrieved': len(all_retrieved_docs),
@@ -316,7 +458,7 @@ Answer:"""
                 'answer': answer
             })
         
-        return {
+        result = {
             'answer': answer,
             'sources': list(all_sources),
             'retrieved_docs': all_retrieved_docs,
@@ -325,3 +467,10 @@ Answer:"""
             'total_docs_used': len(all_retrieved_docs)
         }
 
+        # Only cache real answers: generation errors are transient and the
+        # no-documents placeholder should retry once documents exist
+        if contexts and not answer.startswith("Error generating answer"):
+            self.cache.put(query, result)
+
+        return result
+
@@ -0,0 +1,109 @@
+"""
+ONNX encoder module for running the embedding model with int8 quantization.
+"""
+
+import os
+from typing import List
+
+import numpy as np
+import onnxruntime
+from transformers import AutoTokenizer
+
+MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'models', 'all-MiniLM-L6-v2-onnx-int8'
+)
+QUANTIZED_MODEL_FILE = 'model_quantized.onnx'
+
+# Session and tokenizer are cached at module level so every VectorStore
+# shares one loaded model
+_session = None
+_tokenizer = None
+
+
+def _export_quantized_model():
+    """Export the embedding model to ONNX and quantize it to dynamic int8."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    print("Exporting embedding model to ONNX (one-time setup)...")
+    model = ORTModelForFeatureExtraction.from_pretrained(MODEL_ID, export=True)
+    model.save_pretrained(MODEL_DIR)
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+    tokenizer.save_pretrained(MODEL_DIR)
+
+    quantizer = ORTQuantizer.from_pretrained(MODEL_DIR)
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=MODEL_DIR, quantization_config=qconfig)
+
+
+def _load_session():
+    """Load the quantized ONNX session and tokenizer, exporting on first use."""
+    global _session, _tokenizer
+
+    if _session is None:
+        if not os.path.exists(os.path.join(MODEL_DIR, QUANTIZED_MODEL_FILE)):
+            _export_quantized_model()
+
+        _session = onnxruntime.InferenceSession(
+            os.path.join(MODEL_DIR, QUANTIZED_MODEL_FILE),
+            providers=['CPUExecutionProvider']
+        )
+        _tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
+
+    return _session, _tokenizer
+
+
+class OnnxEncoder:
+    """Sentence encoder backed by an int8-quantized ONNX model."""
+
+    def __init__(self):
+        """Initialize the encoder with the shared session and tokenizer."""
+        self.session, self.tokenizer = _load_session()
+        self.input_names = [inp.name for inp in self.session.get_inputs()]
+
+    def encode(self, sentences: List[str], batch_size: int = 32,
+               show_progress_bar: bool = False,
+               normalize_embeddings: bool = False) -> np.ndarray:
+        """
+        Encode sentences into embeddings.
+
+        Args:
+            sentences: List of sentences to encode
+            batch_size: Number of sentences per forward pass
+            show_progress_bar: Whether to print encoding progress
+            normalize_embeddings: Whether to L2-normalize the embeddings
+
+        Returns:
+            Array of shape (len(sentences), 384) with float32 embeddings
+        """
+        embeddings = []
+
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            if show_progress_bar:
+                print(f"Encoding {min(start + batch_size, len(sentences))}/{len(sentences)}...")
+
+            inputs = self.tokenizer(
+                batch, padding=True, truncation=True,
+                max_length=256, return_tensors='np'
+            )
+            outputs = self.session.run(
+                None, {name: inputs[name] for name in self.input_names}
+            )
+
+            # Mean-pool token embeddings, ignoring padding
+            hidden = outputs[0]
+            mask = inputs['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings.append(pooled)
+
+        embeddings = np.vstack(embeddings).astype('float32')
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings
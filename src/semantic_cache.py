@@ -0,0 +1,93 @@
+"""
+Semantic cache module for short-circuiting repeated or paraphrased queries.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import faiss
+import numpy as np
+
+
+class SemanticCache:
+    """Cache of query results keyed by query embedding similarity."""
+
+    def __init__(self, encode_query: Callable[[str], np.ndarray],
+                 threshold: float = 0.95, max_size: int = 1000):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            encode_query: Function returning a normalized (1, dimension)
+                embedding for a query (VectorStore.encode_query, so lookups
+                share its memo and the later search reuses the same pass)
+            threshold: Minimum cosine similarity for a cache hit
+            max_size: Maximum number of cached entries before LRU eviction
+        """
+        self.encode_query = encode_query
+        self.threshold = threshold
+        self.max_size = max_size
+        self.dimension = 384
+        self.index = faiss.IndexFlatIP(self.dimension)
+        # Query -> {'embedding', 'result'}, ordered oldest-used first
+        self._entries = OrderedDict()
+        # FAISS row -> cache key, parallel to the index
+        self._keys = []
+
+    def _rebuild_index(self):
+        """Rebuild the FAISS index from the surviving entries."""
+        self.index = faiss.IndexFlatIP(self.dimension)
+        self._keys = list(self._entries.keys())
+        if self._keys:
+            embeddings = np.vstack([
+                self._entries[key]['embedding'] for key in self._keys
+            ])
+            self.index.add(embeddings)
+
+    def get(self, query: str) -> Optional[Dict]:
+        """
+        Look up a cached result for a semantically similar query.
+
+        Args:
+            query: User query
+
+        Returns:
+            The cached result dictionary, or None on a cache miss
+        """
+        if self.index.ntotal == 0:
+            return None
+
+        embedding = self.encode_query(query)
+        scores, indices = self.index.search(embedding, 1)
+
+        if scores[0][0] < self.threshold:
+            return None
+
+        key = self._keys[indices[0][0]]
+        self._entries.move_to_end(key)
+        return self._entries[key]['result']
+
+    def put(self, query: str, result: Dict):
+        """
+        Cache the result for a query, evicting the least recently used
+        entry when the cache is full.
+
+        Args:
+            query: User query
+            result: Result dictionary to cache
+        """
+        if query in self._entries:
+            self._entries.move_to_end(query)
+            self._entries[query]['result'] = result
+            return
+
+        embedding = self.encode_query(query)
+
+        if len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+            self._entries[query] = {'embedding': embedding, 'result': result}
+            self._rebuild_index()
+        else:
+            self._entries[query] = {'embedding': embedding, 'result': result}
+            self._keys.append(query)
+            self.index.add(embedding)
@@ -2,22 +2,85 @@
 Vector store module for managing document embeddings and similarity search.
 """
 
-from typing import List, Dict
+import os
+import json
+import asyncio
+import hashlib
+import functools
+from typing import List, Dict, Optional
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+try:
+    import simsimd
+except ImportError:
+    # Optional accelerator; FAISS handles every search path without it
+    simsimd = None
+
+from onnx_encoder import OnnxEncoder, MODEL_ID
+
+
+# Below this corpus size a brute-force SIMD scan beats HNSW graph traversal
+HNSW_MIN_CORPUS_SIZE = 1000
+
+# Below this corpus size SimSIMD's fp16 cosine scan beats even FAISS
+# brute force (no index dispatch, half the memory traffic)
+SIMSIMD_MAX_CORPUS_SIZE = 2000
+
+EMBEDDING_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    '.cache', 'embeddings'
+)
 
 
 class VectorStore:
-    """Simple vector store using FAISS and sentence-transformers."""
-    
+    """Simple vector store using FAISS and an int8 ONNX embedding model."""
+
     def __init__(self):
         """Initialize the vector store with embedding model."""
         print("Loading embedding model...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = OnnxEncoder()
         self.dimension = 384  # Dimension of all-MiniLM-L6-v2 embeddings
         self.index = None
         self.documents = []
+        # Contiguous fp16 copy of the corpus embeddings for SimSIMD scans
+        self._matrix = None
+        # Memoize per-query embeddings so repeated queries (refinement
+        # loops, repeat searches in a session) skip the forward pass
+        self.encode_query = functools.lru_cache(maxsize=512)(self._encode_query)
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Encode a single query to a normalized (1, dimension) embedding."""
+        embedding = np.ascontiguousarray(self.model.encode([query]), dtype='float32')
+        faiss.normalize_L2(embedding)
+        # Cached arrays are shared between callers, so freeze them
+        embedding.setflags(write=False)
+        return embedding
+
+    def _build_index(self, num_vectors: int):
+        """
+        Build a FAISS index sized for the corpus.
+
+        Inner product on L2-normalized vectors is equivalent to cosine
+        similarity and cheaper to compute than full L2 distances. Small
+        corpora use a brute-force flat index; larger ones use an HNSW
+        graph for sub-linear query time, with stored vectors scalar-
+        quantized to 8 bits to cut index memory 4x and speed up the
+        memory-bound vector comparisons (recall impact on MiniLM is
+        typically under 1%).
+
+        Args:
+            num_vectors: Number of vectors in the initial batch
+        """
+        if num_vectors < HNSW_MIN_CORPUS_SIZE:
+            return faiss.IndexFlatIP(self.dimension)
+
+        index = faiss.IndexHNSWSQ(
+            self.dimension, faiss.ScalarQuantizer.QT_8bit, 32,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efConstruction = 200
+        return index
     
     def add_documents(self, documents: List[Dict]):
         """
@@ -31,51 +94,227 @@ class VectorStore:
         
         # Extract text from documents
         texts = [doc['text'] for doc in documents]
-        
-        # Generate embeddings
+
+        # Encoding dominates cold start, so embeddings and the index are
+        # cached on disk keyed by corpus content; caching only applies to
+        # the first batch, which is the whole corpus in practice
+        first_batch = self.index is None
+        cache_key = self._corpus_cache_key(texts) if first_batch else None
+        vectors_path = os.path.join(EMBEDDING_CACHE_DIR, f"vectors_{cache_key}.npy")
+        index_path = os.path.join(EMBEDDING_CACHE_DIR, f"index_{cache_key}.faiss")
+
+        if first_batch and os.path.exists(vectors_path) and os.path.exists(index_path):
+            print("Loading cached embeddings...")
+            self.index = faiss.read_index(index_path)
+            embeddings = np.load(vectors_path)
+            self.documents = [
+                {**doc, 'embedding': embedding}
+                for doc, embedding in zip(documents, embeddings)
+            ]
+            self._matrix = np.ascontiguousarray(embeddings, dtype=np.float16)
+            print(f"Added {len(documents)} documents to vector store")
+            return
+
+        # Generate embeddings; large batches keep the ONNX session saturated
+        # during bulk indexing instead of paying per-batch dispatch overhead
         print("Generating embeddings...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
-        embeddings = np.array(embeddings).astype('float32')
-        
-        # Initialize or update FAISS index
-        if self.index is None:
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.documents = documents.copy()
+        embeddings = self.model.encode(
+            texts, batch_size=256, show_progress_bar=True,
+            normalize_embeddings=True
+        )
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+
+        # Keep each chunk's embedding on its document entry so downstream
+        # reranking can reuse it without re-encoding
+        embedded_docs = [
+            {**doc, 'embedding': embedding}
+            for doc, embedding in zip(documents, embeddings)
+        ]
+
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float16)
+        if first_batch:
+            self.index = self._build_index(len(embeddings))
+            self.documents = embedded_docs
+            self._matrix = matrix
         else:
-            self.documents.extend(documents)
-        
+            self.documents.extend(embedded_docs)
+            self._matrix = np.vstack([self._matrix, matrix])
+
+        # The scalar quantizer needs to learn value ranges before adding
+        if not self.index.is_trained:
+            self.index.train(embeddings)
+
         self.index.add(embeddings)
+
+        if first_batch:
+            os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+            np.save(vectors_path, embeddings)
+            faiss.write_index(self.index, index_path)
+
         print(f"Added {len(documents)} documents to vector store")
+
+    def _corpus_cache_key(self, texts: List[str]) -> str:
+        """
+        Content hash identifying this corpus and embedding model.
+
+        Hashed in corpus order: cached vectors are zipped back against the
+        incoming documents positionally, so a key hit must imply the same
+        chunks in the same order.
+        """
+        fingerprint = MODEL_ID + ''.join(text[:64] for text in texts)
+        return hashlib.blake2b(fingerprint.encode('utf-8')).hexdigest()[:32]
     
-    def search(self, query: str, k: int = 3) -> List[Dict]:
+    def search(self, query: str, k: int = 3,
+               query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
         """
         Search for similar documents.
-        
+
         Args:
             query: Search query
             k: Number of results to return
-            
+            query_embedding: Optional precomputed normalized embedding
+
         Returns:
             List of document dictionaries with text and metadata
         """
+        query_embeddings = None
+        if query_embedding is not None:
+            query_embeddings = query_embedding.reshape(1, self.dimension)
+        return self.search_batch([query], k=k, query_embeddings=query_embeddings)[0]
+
+    def search_batch(self, queries: List[str], k: int = 3,
+                     query_embeddings: Optional[np.ndarray] = None) -> List[List[Dict]]:
+        """
+        Search for similar documents for several queries at once.
+
+        Batching amortizes the embedding forward pass and FAISS call
+        across all queries instead of paying them per query.
+
+        Args:
+            queries: List of search queries
+            k: Number of results to return per query
+            query_embeddings: Optional precomputed normalized embeddings
+
+        Returns:
+            One result list per query, in input order
+        """
         if self.index is None or self.index.ntotal == 0:
-            return []
-        
-        # Encode query
-        query_embedding = self.model.encode([query])
-        query_embedding = np.array(query_embedding).astype('float32')
-        
+            return [[] for _ in queries]
+
+        if query_embeddings is None:
+            if len(queries) == 1:
+                # Single-query searches dominate; serve them memoized
+                query_embeddings = self.encode_query(queries[0])
+            else:
+                # Encode all queries in one forward pass
+                query_embeddings = np.array(self.model.encode(queries)).astype('float32')
+                faiss.normalize_L2(query_embeddings)
+
+        # Small corpora skip FAISS entirely and scan the fp16 matrix
+        if (simsimd is not None and self._matrix is not None
+                and len(self._matrix) <= SIMSIMD_MAX_CORPUS_SIZE):
+            return self._search_matrix(query_embeddings, k)
+
         # Search
         k = min(k, self.index.ntotal)
-        distances, indices = self.index.search(query_embedding, k)
-        
-        # Retrieve documents
+        if isinstance(self.index, faiss.IndexHNSW):
+            self.index.hnsw.efSearch = max(k * 4, 64)
+        scores, indices = self.index.search(query_embeddings, k)
+
+        # Retrieve documents (convert similarity to a distance for backward
+        # compat); HNSW pads unreachable slots with -1 labels, so skip those
         results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            results.append({
-                **self.documents[idx],
-                'distance': float(distance)
-            })
-        
+        for row_indices, row_scores in zip(indices, scores):
+            results.append([
+                {
+                    **self.documents[idx],
+                    'distance': float(1 - score)
+                }
+                for idx, score in zip(row_indices, row_scores)
+                if idx != -1
+            ])
+
         return results
 
+    def _search_matrix(self, query_embeddings: np.ndarray, k: int) -> List[List[Dict]]:
+        """
+        Brute-force cosine top-k over the fp16 matrix with SimSIMD.
+
+        Avoids the FAISS dispatch and array copies that dominate per-query
+        cost on small corpora; cdist returns cosine distances directly, so
+        scores match the 'distance' convention used elsewhere.
+
+        Args:
+            query_embeddings: Normalized float32 query embeddings
+            k: Number of results to return per query
+
+        Returns:
+            One result list per query, in input order
+        """
+        distances = np.asarray(simsimd.cdist(
+            query_embeddings.astype(np.float16), self._matrix, metric='cos'
+        ), dtype=np.float32)
+
+        k = min(k, len(self._matrix))
+        results = []
+        for row in distances:
+            top = np.argpartition(row, k - 1)[:k]
+            top = top[np.argsort(row[top])]
+            results.append([
+                {
+                    **self.documents[idx],
+                    'distance': float(row[idx])
+                }
+                for idx in top
+            ])
+
+        return results
+
+    async def search_async(self, query: str, k: int = 3) -> List[Dict]:
+        """Run search in a worker thread so it can overlap with LLM calls."""
+        return await asyncio.to_thread(self.search, query, k)
+
+    async def search_batch_async(self, queries: List[str], k: int = 3) -> List[List[Dict]]:
+        """Run search_batch in a worker thread so it can overlap with LLM calls."""
+        return await asyncio.to_thread(self.search_batch, queries, k)
+
+    def save(self, path: str):
+        """
+        Persist the FAISS index and documents to disk.
+
+        Args:
+            path: Base path for the saved files (writes path.faiss and path.json)
+        """
+        if self.index is None:
+            raise ValueError("No index to save")
+
+        faiss.write_index(self.index, f"{path}.faiss")
+
+        # Embeddings are numpy arrays, so they go in a sidecar .npy file
+        # and the JSON keeps only the serializable metadata
+        if self.documents and 'embedding' in self.documents[0]:
+            np.save(f"{path}.npy", np.vstack([doc['embedding'] for doc in self.documents]))
+
+        with open(f"{path}.json", 'w', encoding='utf-8') as f:
+            json.dump([
+                {key: value for key, value in doc.items() if key != 'embedding'}
+                for doc in self.documents
+            ], f)
+
+    def load(self, path: str):
+        """
+        Load a previously saved FAISS index and documents from disk.
+
+        Args:
+            path: Base path used when saving (reads path.faiss and path.json)
+        """
+        self.index = faiss.read_index(f"{path}.faiss")
+        with open(f"{path}.json", 'r', encoding='utf-8') as f:
+            self.documents = json.load(f)
+
+        if os.path.exists(f"{path}.npy"):
+            embeddings = np.load(f"{path}.npy")
+            for doc, embedding in zip(self.documents, embeddings):
+                doc['embedding'] = embedding
+            self._matrix = np.ascontiguousarray(embeddings, dtype=np.float16)
+